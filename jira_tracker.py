@@ -1,29 +1,49 @@
 import os
+import re
 import json
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from itertools import groupby
+from types import MappingProxyType
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+try:
+    import orjson  # Opcional: parse/serialização bem mais rápidos
+except ImportError:
+    orjson = None
 
 # ---------------------------------------------------------------------------
 # Configurações via variáveis de ambiente
 # ---------------------------------------------------------------------------
-JIRA_DOMAIN_RAW = os.environ.get("JIRA_DOMAIN", "")
-JIRA_DOMAIN = (
-    JIRA_DOMAIN_RAW.replace("https://", "")
-    .replace("http://", "")
-    .replace(".atlassian.net", "")
-    .strip("/")
-)
+JIRA_DOMAIN_RAW = os.environ.get("JIRA_DOMAIN", "").strip()
+# Aceita "acme", "acme.atlassian.net" ou uma URL completa (com ou sem path)
+_JIRA_HOST = urlsplit(
+    JIRA_DOMAIN_RAW if "://" in JIRA_DOMAIN_RAW else f"https://{JIRA_DOMAIN_RAW}"
+).hostname or ""
+JIRA_DOMAIN = _JIRA_HOST.removesuffix(".atlassian.net")
 JIRA_EMAIL = os.environ.get("JIRA_EMAIL")
 JIRA_API_TOKEN = os.environ.get("JIRA_API_TOKEN")
 JIRA_PROJECT_KEY = os.environ.get("JIRA_PROJECT_KEY", "SIGLA")
 WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")  # Opcional
+JIRA_DEBUG = bool(os.environ.get("JIRA_DEBUG"))     # Opcional: diagnósticos extras
+
+JIRA_BASE_URL = f"https://{JIRA_DOMAIN}.atlassian.net"
+JIRA_BROWSE_URL = f"{JIRA_BASE_URL}/browse/"  # + chave do issue
 
 LAST_STATE_FILE = "last_state.json"
+# Chave reservada no last_state.json para metadados da execução (não é um issue)
+STATE_META_KEY = "_meta"
+# Campos do issue normalizado que são persistidos por card
+STATE_KEYS = ("status", "summary", "assignee", "story_points", "sprint", "epic", "updated")
 
 # Campo de story points varia por instância do Jira.
 # Lista dos customfields mais comuns (em ordem de prioridade).
-STORY_POINTS_FIELDS = [
+STORY_POINTS_FIELDS = (
     "customfield_10043",  # Encontrado nos logs do usuário
     "customfield_10016",  # Jira Software cloud (mais comum)
     "customfield_10028",  # variante comum
@@ -31,83 +51,210 @@ STORY_POINTS_FIELDS = [
     "customfield_10035",  # outra variante
     "customfield_10040",  # outra variante
     "story_points",       # alias legário (raramente funciona)
-]
+)
+_SP_FIELDS_SET = frozenset(STORY_POINTS_FIELDS)  # pertinência O(1) no diagnóstico
+
+# Issues por página na busca JQL. O Jira pode devolver menos que isso
+# (limite do servidor), então o fim da paginação vem de isLast/nextPageToken.
+JIRA_PAGE_SIZE = 500
+
+JIRA_SEARCH_URL = f"{JIRA_BASE_URL}/rest/api/3/search/jql"
+SEARCH_FIELDS = (
+    "summary", "status", "assignee", "reporter",
+    "customfield_10020",   # sprint info
+    "customfield_10014",   # epic link (legacy)
+    "parent",              # pai direto (moderno — epic vem aqui)
+    "issuetype",
+    "updated",             # carimbo de alteração (atalho no main)
+)  # + campos de story points (ver _sp_fields)
+
+# ORDER BY define a ordem dos cards no Slack (mais recentes primeiro em cada grupo)
+SPRINT_JQL = f"project = {JIRA_PROJECT_KEY} AND sprint in openSprints() ORDER BY updated DESC"
+BACKLOG_JQL = f"project = {JIRA_PROJECT_KEY} AND sprint is EMPTY AND updated >= -1d ORDER BY updated DESC"  # ontem ou hoje
+EPICS_JQL = f"project = {JIRA_PROJECT_KEY} AND issuetype = Epic AND updated >= -1d ORDER BY updated DESC"
+
+# ---------------------------------------------------------------------------
+# JSON (orjson quando disponível, stdlib como fallback)
+# ---------------------------------------------------------------------------
+
+def _json_loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj, pretty: bool = False) -> bytes:
+    """JSON em UTF-8, sem escapes ASCII; pretty indenta com 2 espaços."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _json_dumps_state(state: dict) -> bytes:
+    """
+    Serialização canônica do estado. Para os valores que o estado guarda
+    (str, None, bool, int, floats de story points, listas e dicts), as duas
+    implementações geram os mesmos bytes; floats em notação exponencial
+    (ex.: 1e16) são escritos de forma diferente.
+    """
+    if orjson is not None:
+        return orjson.dumps(state, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+    return json.dumps(state, indent=2, sort_keys=True, ensure_ascii=False).encode("utf-8")
+
+
+# ---------------------------------------------------------------------------
+# Sessões HTTP (keep-alive + pool de conexões)
+# ---------------------------------------------------------------------------
+
+def _build_session(
+    status_forcelist: list, total: int = 5, retry_reads: bool = True
+) -> requests.Session:
+    """Cria uma Session com pool de conexões e retry para erros transitórios.
+    O POST entra em allowed_methods: a busca JQL é só leitura e, no webhook,
+    o Slack não publica a mensagem quando responde 429.
+    Com retry_reads=False, erros depois do envio (leitura, timeout de resposta)
+    não são repetidos: o servidor pode já ter processado o POST.
+    Backoff exponencial com jitter; em 429 o Retry-After do servidor prevalece."""
+    session = requests.Session()
+    retries = Retry(
+        total=total,
+        read=None if retry_reads else 0,
+        other=None if retry_reads else 0,
+        backoff_factor=1.0,
+        backoff_jitter=0.5,
+        status_forcelist=status_forcelist,
+        allowed_methods=["GET", "POST"],
+        respect_retry_after_header=True,
+        raise_on_status=False,  # devolve a última resposta; raise_for_status dá o erro
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retries))
+    return session
+
+
+# (conexão, leitura) em segundos: sem timeout, uma conexão travada prende o job.
+# No webhook o timeout de leitura nunca gera reenvio (retry_reads=False).
+HTTP_TIMEOUT = (5, 30)
+
+# Sessões separadas: as credenciais do Jira nunca devem ir para o webhook.
+_JIRA_SESSION = _build_session([429, 500, 502, 503, 504])
+_JIRA_SESSION.auth = (JIRA_EMAIL, JIRA_API_TOKEN)
+_JIRA_SESSION.headers.update({"Accept": "application/json", "Content-Type": "application/json"})
+
+# Webhook: só repete o que com certeza não publicou (falha de conexão e 429),
+# com orçamento menor que o do Jira.
+_WEBHOOK_SESSION = _build_session([429], total=3, retry_reads=False)
+_WEBHOOK_SESSION.headers.update({"Content-Type": "application/json; charset=utf-8"})
 
 # ---------------------------------------------------------------------------
 # Busca de Issues no Jira
 # ---------------------------------------------------------------------------
 
 def _search(jql: str) -> list:
-    """Executa uma busca JQL e retorna a lista de issues."""
-    url = f"https://{JIRA_DOMAIN}.atlassian.net/rest/api/3/search/jql"
-    auth = (JIRA_EMAIL, JIRA_API_TOKEN)
-    headers = {"Accept": "application/json", "Content-Type": "application/json"}
+    """Executa uma busca JQL e retorna a lista de issues (todas as páginas).
+    O endpoint /search/jql pagina por cursor (nextPageToken), não por startAt."""
     payload = {
         "jql": jql,
-        "fields": [
-            "summary", "status", "assignee", "reporter",
-            "customfield_10020",   # sprint info
-            "customfield_10014",   # epic link (legacy)
-            "parent",              # pai direto (moderno — epic vem aqui)
-            "issuetype", "priority"
-        ] + STORY_POINTS_FIELDS,
-        "maxResults": 200,
+        "fields": SEARCH_FIELDS + _sp_fields(),
+        "maxResults": JIRA_PAGE_SIZE,
+        "fieldsByKeys": False,
     }
-    response = requests.post(url, headers=headers, json=payload, auth=auth)
-    response.raise_for_status()
-    issues = response.json().get("issues", [])
-    return issues
-
+    issues = []
+    while True:
+        response = _JIRA_SESSION.post(JIRA_SEARCH_URL, json=payload, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        data = _json_loads(response.content)
+        issues.extend(data.get("issues", []))
+        token = data.get("nextPageToken")
+        if not token or data.get("isLast"):
+            return issues
+        payload["nextPageToken"] = token
+
+
+def _result_or_warn(future, label: str) -> list | None:
+    """Resultado de uma busca; em caso de erro, registra o aviso e retorna None."""
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"Aviso: erro ao buscar {label} — {e}")
+        return None
 
 
-def get_all_issues() -> tuple[list, list]:
+def get_all_issues() -> tuple[list, list, bool]:
     """
-    Retorna (issues_regulares, novos_epicos).
+    Retorna (issues_regulares, novos_epicos, completo).
     issues_regulares = sprint ativa + backlog modificado nas últimas 24h.
     novos_epicos     = épicos criados ou modificados hoje.
+    completo         = False se a busca da sprint ou do backlog falhou; nesse
+                       caso issues_regulares está truncado e o estado novo
+                       precisa ser mesclado ao anterior.
+    As três buscas são independentes e rodam em paralelo na mesma sessão.
     """
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        sprint_future = executor.submit(_search, SPRINT_JQL)
+        backlog_future = executor.submit(_search, BACKLOG_JQL)
+        epics_future = executor.submit(_search, EPICS_JQL)
+
+    sprint_issues = _result_or_warn(sprint_future, "sprint ativa")
+    backlog_issues = _result_or_warn(backlog_future, "backlog")
+    complete = sprint_issues is not None and backlog_issues is not None
+
     issues_map = {}
 
     # Sprint ativa
-    try:
-        sprint_issues = _search(
-            f"project = {JIRA_PROJECT_KEY} AND sprint in openSprints() ORDER BY updated DESC"
-        )
-        for i in sprint_issues:
-            issues_map[i["key"]] = i
-    except Exception as e:
-        print(f"Aviso: erro ao buscar sprint ativa — {e}")
+    for i in sprint_issues or []:
+        issues_map[i["key"]] = i
 
     # Backlog: sem sprint, modificado ontem ou hoje
-    try:
-        backlog_issues = _search(
-            f"project = {JIRA_PROJECT_KEY} AND sprint is EMPTY AND updated >= -1d ORDER BY updated DESC"
-        )
-        for i in backlog_issues:
-            issues_map[i["key"]] = i
-    except Exception as e:
-        print(f"Aviso: erro ao buscar backlog — {e}")
+    for i in backlog_issues or []:
+        issues_map[i["key"]] = i
 
-    # Épicos criados ou atualizados nas últimas 24h
-    new_epics = []
-    try:
-        epic_issues = _search(
-            f"project = {JIRA_PROJECT_KEY} AND issuetype = Epic AND updated >= -1d ORDER BY updated DESC"
-        )
-        new_epics = [normalize_issue(e) for e in epic_issues]
-    except Exception as e:
-        print(f"Aviso: erro ao buscar épicos — {e}")
+    # Épicos criados ou atualizados nas últimas 24h (não entram no estado)
+    epic_issues = _result_or_warn(epics_future, "épicos") or []
+
+    regular_issues = list(issues_map.values())
+    # Diagnóstico só enquanto o campo de SP não foi aprendido (ou em debug)
+    sample = (regular_issues or epic_issues)[:1]
+    if sample and (JIRA_DEBUG or _SP_FIELD is None):
+        _log_sp_field_once(sample[0].get("fields") or _EMPTY)
 
-    return list(issues_map.values()), new_epics
+    new_epics = [normalize_issue(e) for e in epic_issues]
+    return regular_issues, new_epics, complete
 
 
 # ---------------------------------------------------------------------------
 # Extração de campos
 # ---------------------------------------------------------------------------
 
+# Default somente-leitura para campos ausentes ou null: evita alocar um {}
+# novo a cada .get encadeado.
+_EMPTY = MappingProxyType({})
+
+# Campo de story points desta instância, aprendido numa execução anterior e
+# guardado em last_state.json. Enquanto for None, todos os candidatos são usados.
+# Para redescobrir (ex.: o campo mudou no Jira), apague o "_meta" do arquivo.
+_SP_FIELD = None
+
+
+def _sp_fields() -> tuple:
+    """Campos de story points a pedir ao Jira e a consultar em cada issue."""
+    return (_SP_FIELD,) if _SP_FIELD else STORY_POINTS_FIELDS
+
+
+def _discover_sp_field(raw_issues: list) -> str | None:
+    """Primeiro candidato (em ordem de prioridade) com valor em algum issue."""
+    for field in STORY_POINTS_FIELDS:
+        for issue in raw_issues:
+            val = (issue.get("fields") or _EMPTY).get(field)
+            if isinstance(val, (int, float)) and val > 0:
+                return field
+    return None
+
+
 def extract_story_points(fields: dict):
     """Tenta extrair story points de vários campos customizados."""
-    for field in STORY_POINTS_FIELDS:
+    for field in _sp_fields():
         val = fields.get(field)
         if isinstance(val, (int, float)) and val > 0:
             return int(val) if val == int(val) else val
@@ -125,7 +272,7 @@ def _log_sp_field_once(fields: dict):
     if numeric:
         print("[DIAGNÓSTICO SP] Campos numéricos encontrados no issue:")
         for k, v in sorted(numeric.items()):
-            marker = " <-- candidato (está em STORY_POINTS_FIELDS)" if k in STORY_POINTS_FIELDS else ""
+            marker = " <-- candidato (está em STORY_POINTS_FIELDS)" if k in _SP_FIELDS_SET else ""
             print(f"  {k}: {v}{marker}")
     else:
         print("[DIAGNÓSTICO SP] Nenhum campo numérico com valor > 0 encontrado.")
@@ -154,11 +301,12 @@ def extract_epic(fields: dict) -> dict | None:
     # Modelo moderno: parent com issuetype Epic
     parent = fields.get("parent")
     if parent:
-        parent_type = parent.get("fields", {}).get("issuetype", {}).get("name", "")
+        parent_fields = parent.get("fields") or _EMPTY
+        parent_type = (parent_fields.get("issuetype") or _EMPTY).get("name", "")
         if parent_type == "Epic":
             return {
                 "key": parent.get("key"),
-                "summary": parent.get("fields", {}).get("summary", parent.get("key")),
+                "summary": parent_fields.get("summary", parent.get("key")),
             }
 
     # Legado: epic link customfield
@@ -169,34 +317,27 @@ def extract_epic(fields: dict) -> dict | None:
     return None
 
 
-_SP_DIAGNOSTIC_DONE = False
-
-
 def normalize_issue(issue: dict) -> dict:
     """Extrai e normaliza os campos relevantes de um issue bruto do Jira."""
-    global _SP_DIAGNOSTIC_DONE
-    fields = issue.get("fields", {})
+    fields = issue.get("fields") or _EMPTY
     assignee = fields.get("assignee")
     reporter = fields.get("reporter")
     sprint_name = extract_sprint_name(fields)
     epic = extract_epic(fields)
     sp = extract_story_points(fields)
 
-    if not _SP_DIAGNOSTIC_DONE:
-        _log_sp_field_once(fields)
-        _SP_DIAGNOSTIC_DONE = True
-
     return {
         "key": issue["key"],
         "summary": fields.get("summary", "Sem resumo"),
-        "status": fields.get("status", {}).get("name", "Desconhecido"),
-        "issuetype": fields.get("issuetype", {}).get("name", ""),
+        "status": (fields.get("status") or _EMPTY).get("name", "Desconhecido"),
+        "issuetype": (fields.get("issuetype") or _EMPTY).get("name", ""),
         "assignee": assignee.get("displayName") if assignee else None,
         "reporter": reporter.get("displayName") if reporter else None,
         "story_points": sp,
         "sprint": sprint_name,
         "epic": epic,
-        "link": f"https://{JIRA_DOMAIN}.atlassian.net/browse/{issue['key']}",
+        "link": JIRA_BROWSE_URL + issue["key"],
+        "updated": fields.get("updated"),
     }
 
 
@@ -204,25 +345,68 @@ def normalize_issue(issue: dict) -> dict:
 # Estado persistido
 # ---------------------------------------------------------------------------
 
-def load_last_state() -> dict:
-    if os.path.exists(LAST_STATE_FILE):
-        with open(LAST_STATE_FILE, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-    return {}
+# Bytes do last_state.json como lidos do disco; permite pular a escrita
+# quando o estado novo serializa exatamente igual.
+_LAST_RAW = None
 
 
-def save_current_state(state: dict):
-    with open(LAST_STATE_FILE, "w", encoding="utf-8") as f:
-        json.dump(state, f, indent=4, ensure_ascii=False)
+def load_last_state() -> dict:
+    global _LAST_RAW
+    try:
+        with open(LAST_STATE_FILE, "rb") as f:
+            _LAST_RAW = f.read()
+    except FileNotFoundError:
+        return {}
+    try:
+        return _json_loads(_LAST_RAW)
+    except ValueError:  # JSONDecodeError de ambas as libs
+        return {}
+
+
+def save_current_state(state: dict) -> bool:
+    """Grava o estado; retorna False (sem tocar no arquivo) se nada mudou.
+    sort_keys deixa a serialização canônica, independente da ordem do Jira."""
+    global _LAST_RAW
+    new_raw = _json_dumps_state(state)
+    if new_raw == _LAST_RAW:
+        return False
+    # Grava num temporário e troca de uma vez: uma falha no meio da escrita
+    # não deixa o last_state.json truncado (o que zeraria o histórico).
+    tmp_path = LAST_STATE_FILE + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(new_raw)
+    os.replace(tmp_path, LAST_STATE_FILE)
+    _LAST_RAW = new_raw
+    return True
 
 
 # ---------------------------------------------------------------------------
 # Detecção de mudanças
 # ---------------------------------------------------------------------------
 
+def _is_blank(value) -> bool:
+    return not value
+
+
+def _is_none(value) -> bool:
+    return value is None
+
+
+# Campos comparados por detect_changes:
+# (campo, formato da troca, formato "definido", formato "removido", vazio?)
+# Sem formatos de definido/removido, toda diferença é reportada como troca.
+_CHANGE_SPECS = (
+    ("status", "🔄 *Status:* `{p}` ➡️ `{c}`", None, None, _is_none),
+    ("assignee", "👤 *Responsável:* `{p}` ➡️ `{c}`",
+     "👤 *Atribuído a:* `{c}`", "👤 *Responsável removido* (era `{p}`)", _is_blank),
+    # extract_story_points só devolve None ou um número > 0; None é "sem story points"
+    ("story_points", "🎯 *Story Points:* `{p}` ➡️ `{c}`",
+     "🎯 *Story Points definidos:* `{c}`", "🎯 *Story Points removidos* (eram `{p}`)", _is_none),
+    ("sprint", "📌 *Sprint:* `{p}` ➡️ `{c}`",
+     "📌 *Entrou na sprint:* `{c}`", "📌 *Saiu da sprint* `{p}` → backlog", _is_blank),
+)
+
+
 def detect_changes(current: dict, previous: dict) -> list:
     """
     Compara o estado atual com o anterior de um card e retorna uma lista
@@ -230,42 +414,18 @@ def detect_changes(current: dict, previous: dict) -> list:
     """
     changes = []
 
-    if current["status"] != previous.get("status"):
-        changes.append(
-            f"🔄 *Status:* `{previous.get('status', '?')}` ➡️ `{current['status']}`"
-        )
-
-    curr_assignee = current["assignee"]
-    prev_assignee = previous.get("assignee")
-    if curr_assignee != prev_assignee:
-        if not prev_assignee:
-            changes.append(f"👤 *Atribuído a:* `{curr_assignee}`")
-        elif not curr_assignee:
-            changes.append(f"👤 *Responsável removido* (era `{prev_assignee}`)")
-        else:
-            changes.append(f"👤 *Responsável:* `{prev_assignee}` ➡️ `{curr_assignee}`")
-
-    curr_sp = current["story_points"]
-    prev_sp = previous.get("story_points")
-    if curr_sp != prev_sp:
-        if prev_sp is None:
-            changes.append(f"🎯 *Story Points definidos:* `{curr_sp}`")
-        elif curr_sp is None:
-            changes.append(f"🎯 *Story Points removidos* (eram `{prev_sp}`)")
-        else:
-            changes.append(f"🎯 *Story Points:* `{prev_sp}` ➡️ `{curr_sp}`")
-
-    curr_sprint = current["sprint"]
-    prev_sprint = previous.get("sprint")
-    if curr_sprint != prev_sprint:
-        if curr_sprint and not prev_sprint:
-            changes.append(f"📌 *Entrou na sprint:* `{curr_sprint}`")
-        elif not curr_sprint and prev_sprint:
-            changes.append(f"📌 *Saiu da sprint* `{prev_sprint}` → backlog")
+    for field, changed_fmt, added_fmt, removed_fmt, is_empty in _CHANGE_SPECS:
+        curr = current[field]
+        prev = previous.get(field)
+        if curr == prev:
+            continue
+        if added_fmt and is_empty(prev) and not is_empty(curr):
+            fmt = added_fmt
+        elif removed_fmt and is_empty(curr) and not is_empty(prev):
+            fmt = removed_fmt
         else:
-            changes.append(
-                f"📌 *Sprint:* `{prev_sprint}` ➡️ `{curr_sprint}`"
-            )
+            fmt = changed_fmt
+        changes.append(fmt.format(p=previous.get(field, "?"), c=curr))
 
     return changes
 
@@ -274,6 +434,64 @@ def detect_changes(current: dict, previous: dict) -> list:
 # Sumário via Gemini AI (opcional)
 # ---------------------------------------------------------------------------
 
+# Gemini responde em markdown; o Slack usa mrkdwn. Padrões da conversão:
+_RE_MD_BOLD = re.compile(r'\*\*(.+?)\*\*')
+_RE_MD_HEADER = re.compile(r'#{1,6}\s*(.+)')
+_RE_MD_STAR_ITEM = re.compile(r'(?m)^(\s*)\*\s+')
+_RE_MD_DASH_ITEM = re.compile(r'(?m)^(\s*)-\s+')
+# Remove a marcação mrkdwn (* e `) das mudanças antes de mandá-las no prompt
+_MD_STRIP = str.maketrans("", "", "*`")
+
+# Timeout por requisição ao Gemini (o SDK espera milissegundos)
+GEMINI_TIMEOUT_MS = 60_000
+
+# Instruções fixas do prompt; os dados da execução vão logo depois
+_GEMINI_INSTRUCTIONS = (
+    "Você é um analista ágil extremamente direto gerando um relatório de andamento de Sprints para o C-Level, "
+    "Product Manager e Gerente de Tecnologia.\n\n"
+    "Regras de Tom e Formatação:\n"
+    "- Seja puramente executivo, objetivo e factual. Abandone QUALQUER tom conversacional, coloquial ou empolgado (NÃO use 'E aí, time', NÃO use 'Bora lá', NÃO use 'Ufa!', 'Fresquinhas', etc).\n"
+    "- O relatório DEVE começar diretamente no conteúdo da análise, sem saudações ou introduções amistosas.\n"
+    "- Intercale blocos de texto extremamente sucintos com listas (bullet points) das entregas, mudanças ou riscos.\n"
+    "- A narrativa deve seguir o fluxo: Concluído > Ready for Prod > Staging > Code Review > Em Andamento > Pendente.\n"
+    "- Reflita os progressos sempre agrupando em torno dos Épicos (se houver epic), para dar visibilidade de negócio.\n"
+    "- Sinalize taticamente itens sem responsável ou sem estimativa (sem story points) como pontos de atenção.\n"
+    "- Não cite as chaves lógicas dos cards (ex: MB-123) no meio do texto, fale sobre o título ou o que a tarefa faz.\n"
+    "- Encerre o relatório com uma breve 'Sugestão para a Daily', apontando 1 ou 2 tópicos críticos que o PO/PM deve puxar hoje com o time baseados nos dados.\n\n"
+)
+
+_GEMINI_CLIENT = None
+
+
+def _gemini_client():
+    """Cliente Gemini criado uma vez e reaproveitado entre chamadas.
+    O SDK é pesado e só é importado aqui, no primeiro uso: execuções sem
+    GEMINI_API_KEY ou sem mudanças nunca pagam esse import.
+    Retorna None se o pacote google-genai não estiver instalado."""
+    global _GEMINI_CLIENT
+    if _GEMINI_CLIENT is None:
+        try:
+            from google import genai
+        except ImportError:
+            return None
+        _GEMINI_CLIENT = genai.Client(
+            api_key=GEMINI_API_KEY,
+            http_options={"timeout": GEMINI_TIMEOUT_MS},
+        )
+    return _GEMINI_CLIENT
+
+
+def _prompt_card_line(i: dict) -> str:
+    """Linha de contexto do prompt para um card novo (sprint ou backlog)."""
+    sp = f"{i['story_points']} pts" if i["story_points"] else "sem estimativa"
+    resp = i["assignee"] or "sem responsável"
+    reporter = i.get("reporter") or "desconhecido"
+    epic_label = f"{i['epic']['summary']}" if i.get("epic") else "sem épico"
+    return (
+        f"- {i['key']}: {i['summary']} | Épico: {epic_label} | Status: {i['status']} | Responsável: {resp} | Relator: {reporter} | SP: {sp}"
+    )
+
+
 def generate_ai_summary(
     new_sprint: list,
     new_backlog: list,
@@ -284,8 +502,10 @@ def generate_ai_summary(
     if not GEMINI_API_KEY:
         return None
     try:
-        from google import genai
-        client = genai.Client(api_key=GEMINI_API_KEY)
+        client = _gemini_client()
+        if client is None:
+            print("Aviso: GEMINI_API_KEY definida, mas o pacote google-genai não está instalado.")
+            return "__GEMINI_ERROR__"
 
         context_lines = []
 
@@ -299,54 +519,25 @@ def generate_ai_summary(
 
         if new_sprint:
             context_lines.append("\n=== NOVOS CARDS NA SPRINT ===")
-            for item in new_sprint:
-                i = item["issue"]
-                sp = f"{i['story_points']} pts" if i["story_points"] else "sem estimativa"
-                resp = i["assignee"] or "sem responsável"
-                reporter = i.get("reporter") or "desconhecido"
-                epic_label = f"{i['epic']['summary']}" if i.get("epic") else "sem épico"
-                context_lines.append(
-                    f"- {i['key']}: {i['summary']} | Épico: {epic_label} | Status: {i['status']} | Responsável: {resp} | Relator: {reporter} | SP: {sp}"
-                )
+            context_lines.extend(_prompt_card_line(item["issue"]) for item in new_sprint)
 
         if new_backlog:
             context_lines.append("\n=== NOVOS CARDS NO BACKLOG ===")
-            for item in new_backlog:
-                i = item["issue"]
-                sp = f"{i['story_points']} pts" if i["story_points"] else "sem estimativa"
-                resp = i["assignee"] or "sem responsável"
-                reporter = i.get("reporter") or "desconhecido"
-                epic_label = f"{i['epic']['summary']}" if i.get("epic") else "sem épico"
-                context_lines.append(
-                    f"- {i['key']}: {i['summary']} | Épico: {epic_label} | Status: {i['status']} | Responsável: {resp} | Relator: {reporter} | SP: {sp}"
-                )
+            context_lines.extend(_prompt_card_line(item["issue"]) for item in new_backlog)
 
         if changed:
             context_lines.append("\n=== CARDS COM MUDANÇAS ===")
             for item in changed:
                 i = item["issue"]
                 mudancas = "; ".join(
-                    c.replace("*", "").replace("`", "") for c in item["changes"]
+                    c.translate(_MD_STRIP) for c in item["changes"]
                 )
                 epic_label = f"{i['epic']['summary']}" if i.get("epic") else "sem épico"
                 context_lines.append(f"- {i['key']}: {i['summary']} | Épico: {epic_label} | {mudancas}")
 
         context = "\n".join(context_lines)
 
-        prompt = (
-            "Você é um analista ágil extremamente direto gerando um relatório de andamento de Sprints para o C-Level, "
-            "Product Manager e Gerente de Tecnologia.\n\n"
-            "Regras de Tom e Formatação:\n"
-            "- Seja puramente executivo, objetivo e factual. Abandone QUALQUER tom conversacional, coloquial ou empolgado (NÃO use 'E aí, time', NÃO use 'Bora lá', NÃO use 'Ufa!', 'Fresquinhas', etc).\n"
-            "- O relatório DEVE começar diretamente no conteúdo da análise, sem saudações ou introduções amistosas.\n"
-            "- Intercale blocos de texto extremamente sucintos com listas (bullet points) das entregas, mudanças ou riscos.\n"
-            "- A narrativa deve seguir o fluxo: Concluído > Ready for Prod > Staging > Code Review > Em Andamento > Pendente.\n"
-            "- Reflita os progressos sempre agrupando em torno dos Épicos (se houver epic), para dar visibilidade de negócio.\n"
-            "- Sinalize taticamente itens sem responsável ou sem estimativa (sem story points) como pontos de atenção.\n"
-            "- Não cite as chaves lógicas dos cards (ex: MB-123) no meio do texto, fale sobre o título ou o que a tarefa faz.\n"
-            "- Encerre o relatório com uma breve 'Sugestão para a Daily', apontando 1 ou 2 tópicos críticos que o PO/PM deve puxar hoje com o time baseados nos dados.\n\n"
-            f"=== DADOS BRUTOS DA SPRINT ===\n{context}"
-        )
+        prompt = f"{_GEMINI_INSTRUCTIONS}=== DADOS BRUTOS DA SPRINT ===\n{context}"
 
         # Tenta modelo estável, com fallback
         for model_name in ["gemini-2.5-flash"]:
@@ -358,11 +549,10 @@ def generate_ai_summary(
                 print(f"Gemini respondeu com modelo: {model_name}")
                 text = response.text.strip()
                 # Gemini usa markdown; Slack usa mrkdwn — converte
-                import re
-                text = re.sub(r'\*\*(.+?)\*\*', r'*\1*', text)   # **bold** → *bold*
-                text = re.sub(r'#{1,6}\s*(.+)', r'*\1*', text)    # # Título → *Título*
-                text = re.sub(r'(?m)^(\s*)\*\s+', r'\1• ', text)  # * list → • list
-                text = re.sub(r'(?m)^(\s*)-\s+', r'\1• ', text)   # - list → • list
+                text = _RE_MD_BOLD.sub(r'*\1*', text)       # **bold** → *bold*
+                text = _RE_MD_HEADER.sub(r'*\1*', text)     # # Título → *Título*
+                text = _RE_MD_STAR_ITEM.sub(r'\1• ', text)  # * list → • list
+                text = _RE_MD_DASH_ITEM.sub(r'\1• ', text)  # - list → • list
                 return text
             except Exception as model_err:
                 print(f"Modelo {model_name} falhou: {model_err}")
@@ -376,6 +566,45 @@ def generate_ai_summary(
 # Formatação Slack Block Kit
 # ---------------------------------------------------------------------------
 
+# Blocos constantes, compartilhados entre chamadas (nunca são mutados).
+_OPEN_BUTTON_TEXT = {"type": "plain_text", "text": "Abrir", "emoji": True}
+_HEADER_BLOCK = {
+    "type": "header",
+    "text": {"type": "plain_text", "text": "🔔 Resumo Diário do Jira", "emoji": True},
+}
+_DIVIDER_BLOCK = {"type": "divider"}
+_FOOTER_BLOCK = {
+    "type": "context",
+    "elements": [{"type": "mrkdwn", "text": "_Monitoramento automático via GitHub Actions_"}],
+}
+
+# Limite seguro de texto por section do Slack (máx permitido: 3000)
+SLACK_SECTION_TEXT_LIMIT = 2900
+
+
+def _pack_lines(lines, limit: int = SLACK_SECTION_TEXT_LIMIT):
+    """
+    Agrupa linhas em textos de até `limit` caracteres, quebrando apenas
+    entre linhas. Uma linha que sozinha passa do limite é fatiada.
+    """
+    chunk = []
+    size = 0
+    for line in lines:
+        while len(line) > limit:
+            if chunk:
+                yield "\n".join(chunk)
+                chunk, size = [], 0
+            yield line[:limit]
+            line = line[limit:]
+        if chunk and size + len(line) + 1 > limit:
+            yield "\n".join(chunk)
+            chunk, size = [], 0
+        chunk.append(line)
+        size += len(line) + 1
+    if chunk:
+        yield "\n".join(chunk)
+
+
 def _issue_card_block(issue: dict, changes: list | None = None, prev_status: str | None = None) -> dict:
     """
     Bloco Slack rico (section + botão Abrir).
@@ -406,16 +635,14 @@ def _issue_card_block(issue: dict, changes: list | None = None, prev_status: str
         lines.append(f"🔹 Status: `{issue['status']}`")
 
     # Story points + sprint na mesma linha
-    sp_text = f"🎯 `{sp} pts`" if sp else ""
-    sprint_text = f"📌 `{sprint}`"
-    meta_line = "  |  ".join(filter(None, [sp_text, sprint_text]))
-    lines.append(meta_line)
+    if sp:
+        lines.append(f"🎯 `{sp} pts`  |  📌 `{sprint}`")
+    else:
+        lines.append(f"📌 `{sprint}`")
 
     # Mudanças: filtra a de status (já exibida acima)
     if changes:
-        non_status = [c for c in changes if "Status:" not in c]
-        if non_status:
-            lines.append("\n".join(non_status))
+        lines.extend(c for c in changes if "Status:" not in c)
 
     text = "\n".join(lines)
     return {
@@ -423,28 +650,75 @@ def _issue_card_block(issue: dict, changes: list | None = None, prev_status: str
         "text": {"type": "mrkdwn", "text": text},
         "accessory": {
             "type": "button",
-            "text": {"type": "plain_text", "text": "Abrir", "emoji": True},
+            "text": _OPEN_BUTTON_TEXT,
             "url": issue["link"],
             "action_id": f"btn_{issue['key']}",
         },
     }
 
 
-def _group_by_epic(items: list) -> dict:
+def _epic_sort_key(item: dict) -> tuple:
+    """Ordena por chave do épico, com os cards sem épico por último."""
+    epic = item["issue"].get("epic")
+    # parent.key pode vir None: "or" evita comparar None com str no sorted
+    return (epic is None, (epic or _EMPTY).get("key") or "")
+
+
+def _group_by_epic(items: list):
     """
-    Agrupa uma lista de {'issue': ...} por épico.
-    Retorna dict: {'Nome do Épico (MB-xx)': [item, ...], '— Sem épico': [...]}
+    Agrupa uma lista de {'issue': ...} por épico, em passada única (groupby).
+    Gera tuplas ('Nome do Épico (MB-xx)', [item, ...]), terminando em '— Sem épico'.
     """
-    from collections import defaultdict
-    groups = defaultdict(list)
-    for item in items:
-        epic = item["issue"].get("epic")
-        if epic:
-            label = f"{epic['summary']} ({epic['key']})"
+    for _, group in groupby(sorted(items, key=_epic_sort_key), key=_epic_sort_key):
+        group_items = list(group)
+        epic = group_items[0]["issue"].get("epic")
+        label = f"{epic['summary']} ({epic['key']})" if epic else "— Sem épico"
+        yield label, group_items
+
+
+def _section_blocks(items: list, section_title: str, show_changes: bool = False) -> list:
+    """Título de seção + cards agrupados por épico (lista vazia se não há itens)."""
+    if not items:
+        return []
+    section = [{"type": "section", "text": {"type": "mrkdwn", "text": section_title}}]
+    append, extend = section.append, section.extend
+    for epic_label, group_items in _group_by_epic(items):
+        # Cabeçalho do grupo de épico
+        append({
+            "type": "context",
+            "elements": [{"type": "mrkdwn", "text": f"📌 *Épico: {epic_label}*"}],
+        })
+        if show_changes:
+            extend(
+                _issue_card_block(item["issue"], item.get("changes"), item.get("prev_status"))
+                for item in group_items
+            )
         else:
-            label = "— Sem épico"
-        groups[label].append(item)
-    return dict(groups)
+            extend(_issue_card_block(item["issue"]) for item in group_items)
+    append(_DIVIDER_BLOCK)
+    return section
+
+
+def build_issue_blocks(
+    new_sprint: list,
+    new_backlog: list,
+    changed: list,
+    new_epics: list,
+) -> list:
+    """Blocos das listas de cards (épicos, sprint, backlog, atualizados).
+    Não dependem do Gemini, então podem ser montados enquanto ele responde."""
+    blocks = []
+
+    # Novos épicos
+    if new_epics:
+        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": f"*📌 Novos Épicos ({len(new_epics)})*"}})
+        blocks.extend(_issue_card_block(epic) for epic in new_epics)
+        blocks.append(_DIVIDER_BLOCK)
+
+    blocks.extend(_section_blocks(new_sprint, f"*🆕 Novos na Sprint ({len(new_sprint)})*"))
+    blocks.extend(_section_blocks(new_backlog, f"*📋 Novos no Backlog ({len(new_backlog)})*"))
+    blocks.extend(_section_blocks(changed, f"*🔄 Atualizados ({len(changed)})*", show_changes=True))
+    return blocks
 
 
 def build_slack_payload(
@@ -453,77 +727,41 @@ def build_slack_payload(
     changed: list,
     new_epics: list,
     ai_summary: str | None,
+    issue_blocks: list | None = None,
 ) -> dict:
     now = datetime.now(timezone.utc).strftime("%d/%m/%Y às %H:%Mh UTC")
     total = len(new_sprint) + len(new_backlog) + len(changed) + len(new_epics)
 
     blocks = [
-        {
-            "type": "header",
-            "text": {"type": "plain_text", "text": "🔔 Resumo Diário do Jira", "emoji": True},
-        },
+        _HEADER_BLOCK,
         {
             "type": "context",
             "elements": [{"type": "mrkdwn", "text": f"📅 {now}  |  *{total} alteração(ões) detectada(s)*"}],
         },
-        {"type": "divider"},
+        _DIVIDER_BLOCK,
     ]
 
     # --- IA em prosa ---
     if ai_summary and ai_summary != "__GEMINI_ERROR__":
         blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": "🤖 *Análise do Gemini*"}})
         
-        current_chunk = ""
-        for line in ai_summary.split("\n"):
-            if len(current_chunk) + len(line) + 1 > 2900:
-                blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": current_chunk.strip()}})
-                current_chunk = line + "\n"
-            else:
-                current_chunk += line + "\n"
-        
-        if current_chunk.strip():
-            blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": current_chunk.strip()}})
-            
-        blocks.append({"type": "divider"})
+        for text in _pack_lines(ai_summary.split("\n")):
+            text = text.strip()
+            if text:  # o Slack rejeita section com texto vazio
+                blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": text}})
+
+        blocks.append(_DIVIDER_BLOCK)
     elif ai_summary == "__GEMINI_ERROR__":
         blocks.append({
             "type": "context",
             "elements": [{"type": "mrkdwn", "text": "_⚠️ Gemini não respondeu (erro na API). As listas abaixo são a referência completa._"}],
         })
 
-    def _add_section(items: list, section_title: str, show_changes: bool = False):
-        """Adiciona título de seção + cards agrupados por épico."""
-        if not items:
-            return
-        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": section_title}})
-        groups = _group_by_epic(items)
-        for epic_label, group_items in groups.items():
-            # Cabeçalho do grupo de épico
-            blocks.append({
-                "type": "context",
-                "elements": [{"type": "mrkdwn", "text": f"📌 *Épico: {epic_label}*"}],
-            })
-            for item in group_items:
-                changes = item.get("changes") if show_changes else None
-                prev_status = item.get("prev_status") if show_changes else None
-                blocks.append(_issue_card_block(item["issue"], changes, prev_status))
-        blocks.append({"type": "divider"})
+    if issue_blocks is None:
+        issue_blocks = build_issue_blocks(new_sprint, new_backlog, changed, new_epics)
+    blocks.extend(issue_blocks)
 
-    # Novos épicos
-    if new_epics:
-        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": f"*📌 Novos Épicos ({len(new_epics)})*"}})
-        for epic in new_epics:
-            blocks.append(_issue_card_block(epic))
-        blocks.append({"type": "divider"})
-
-    _add_section(new_sprint, f"*🆕 Novos na Sprint ({len(new_sprint)})*")
-    _add_section(new_backlog, f"*📋 Novos no Backlog ({len(new_backlog)})*")
-    _add_section(changed, f"*🔄 Atualizados ({len(changed)})*", show_changes=True)
-
-    blocks.append({
-        "type": "context",
-        "elements": [{"type": "mrkdwn", "text": "_Monitoramento automático via GitHub Actions_"}],
-    })
+    blocks.append(_FOOTER_BLOCK)
 
     return {
         "text": f"🔔 Resumo Diário do Jira — {total} alteração(ões)",
@@ -545,25 +783,35 @@ def _chunk_blocks(blocks: list, header_blocks: list) -> list[list]:
     O header_blocks é repetido no início de cada página.
     Retorna uma lista de listas de blocos.
     """
-    pages = []
-    # Blocos que não são o cabeçalho
-    content = blocks[len(header_blocks):]
-    page = list(header_blocks)
-    for block in content:
-        if len(page) + 1 > SLACK_MAX_BLOCKS:
-            pages.append(page)
-            page = list(header_blocks)
-        page.append(block)
-    if page:
-        pages.append(page)
+    # Fatia os blocos após o cabeçalho em pedaços do espaço que sobra por página
+    per_page = SLACK_MAX_BLOCKS - len(header_blocks)
+    start = len(header_blocks)
+    pages = [
+        header_blocks + blocks[i:i + per_page]
+        for i in range(start, len(blocks), per_page)
+    ]
+    if not pages and header_blocks:
+        pages.append(list(header_blocks))  # só cabeçalho: ainda é uma página
     return pages
 
 
+def _is_read_timeout(exc: Exception) -> bool:
+    """Timeout esperando a resposta (o corpo já foi enviado). Com read=0 no
+    Retry, o requests entrega isso como ConnectionError(MaxRetryError)."""
+    if isinstance(exc, requests.exceptions.ReadTimeout):
+        return True
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, ReadTimeoutError)
+
+
 def send_alert(payload: dict):
     """Envia o payload Block Kit ao Webhook do Slack, paginando se necessário."""
     if not WEBHOOK_URL:
-        print("WEBHOOK_URL não configurado. Imprimindo payload no console:")
-        print(json.dumps(payload, indent=2, ensure_ascii=False))
+        print(f"WEBHOOK_URL não configurado; payload com {len(payload.get('blocks', []))} bloco(s) não enviado.")
+        if JIRA_DEBUG:
+            print(_json_dumps(payload, pretty=True).decode("utf-8"))
+        else:
+            print("Defina JIRA_DEBUG=1 para imprimir o payload completo no console.")
         return
 
     blocks = payload.get("blocks", [])
@@ -581,12 +829,17 @@ def send_alert(payload: dict):
                 "blocks": chunk
             })
 
+    # Sequencial de propósito: as páginas precisam chegar na ordem (parte i/N)
     for i, page_payload in enumerate(pages):
         try:
-            response = requests.post(WEBHOOK_URL, json=page_payload)
+            response = _WEBHOOK_SESSION.post(WEBHOOK_URL, data=_json_dumps(page_payload), timeout=HTTP_TIMEOUT)
             response.raise_for_status()
         except Exception as e:
-            print(f"Erro ao enviar webhook (página {i+1}): {e}")
+            if _is_read_timeout(e):
+                # O POST chegou ao Slack; reenviar poderia duplicar a mensagem
+                print(f"Aviso: Slack não respondeu a tempo (página {i+1}); pode ter sido publicada, não reenviada.")
+            else:
+                print(f"Erro ao enviar webhook (página {i+1}): {e}")
 
 
 
@@ -594,21 +847,39 @@ def send_alert(payload: dict):
 # Main
 # ---------------------------------------------------------------------------
 
+def _save_and_report(state: dict):
+    if save_current_state(state):
+        print("Estado atualizado no last_state.json")
+    else:
+        print("Estado inalterado; last_state.json não foi reescrito.")
+
+
 def main():
+    global _SP_FIELD
     if not all([JIRA_DOMAIN, JIRA_EMAIL, JIRA_API_TOKEN]):
         print("Erro: Variáveis de ambiente do Jira ausentes. Verifique JIRA_DOMAIN, JIRA_EMAIL e JIRA_API_TOKEN.")
         return
 
+    last_state = load_last_state()
+    meta = last_state.pop(STATE_META_KEY, {})
+    _SP_FIELD = meta.get("sp_field")
+
     print("Buscando issues no Jira (sprint ativa + backlog)...")
     try:
-        raw_issues, new_epics = get_all_issues()
+        raw_issues, new_epics, complete = get_all_issues()
     except Exception as e:
         print(f"Erro ao buscar issues no Jira: {e}")
         return
 
     print(f"{len(raw_issues)} issue(s) + {len(new_epics)} épico(s) encontrado(s).")
 
-    last_state = load_last_state()
+    if not raw_issues:
+        # Nada para comparar. Também evita gravar um estado vazio quando as
+        # buscas falharam (get_all_issues só registra avisos), o que faria a
+        # próxima execução reportar todos os cards como novos.
+        print("Nenhuma issue retornada pelo Jira; estado mantido.")
+        return
+
     current_state = {}
 
     new_sprint = []     # Cards novos que estão na sprint ativa
@@ -616,20 +887,22 @@ def main():
     changed = []        # Cards existentes com alguma mudança
 
     for raw in raw_issues:
+        key = raw["key"]
+        previous = last_state.get(key)
+
+        # Card intocado desde a última execução: reaproveita o estado salvo
+        # sem normalizar nem comparar campo a campo.
+        updated = (raw.get("fields") or _EMPTY).get("updated")
+        if updated and previous and previous.get("updated") == updated:
+            current_state[key] = previous
+            continue
+
         issue = normalize_issue(raw)
-        key = issue["key"]
 
         # Persiste estado atual
-        current_state[key] = {
-            "status": issue["status"],
-            "summary": issue["summary"],
-            "assignee": issue["assignee"],
-            "story_points": issue["story_points"],
-            "sprint": issue["sprint"],
-            "epic": issue.get("epic"),
-        }
-
-        if key not in last_state:
+        current_state[key] = {k: issue[k] for k in STATE_KEYS}
+
+        if previous is None:
             # Card novo — decide se está na sprint ou no backlog
             if issue["sprint"]:
                 new_sprint.append({"issue": issue})
@@ -637,27 +910,49 @@ def main():
                 new_backlog.append({"issue": issue})
         else:
             # Card existente — detecta mudanças
-            diffs = detect_changes(issue, last_state[key])
+            diffs = detect_changes(issue, previous)
             if diffs:
                 changed.append({
                     "issue": issue,
                     "changes": diffs,
-                    "prev_status": last_state[key].get("status"),
+                    "prev_status": previous.get("status"),
                 })
 
+    if not complete:
+        # Busca parcial: os cards da busca que falhou não vieram, mas seguem
+        # no estado com a última versão conhecida. Sem isso a próxima execução
+        # os anunciaria de novo, como novos.
+        print("Busca da sprint ou do backlog falhou; estado mesclado com o anterior.")
+        current_state = {**last_state, **current_state}
+
+    if _SP_FIELD is None:
+        _SP_FIELD = _discover_sp_field(raw_issues)
+        if _SP_FIELD:
+            print(f"Campo de story points detectado: {_SP_FIELD} (salvo no estado)")
+    if _SP_FIELD:
+        current_state[STATE_META_KEY] = {"sp_field": _SP_FIELD}
+
     if not (new_sprint or new_backlog or changed):
         print("Nenhuma mudança detectada.")
-        save_current_state(current_state)
-        print("Estado atualizado no last_state.json")
+        _save_and_report(current_state)
         return
 
-    # Gera sumário via Gemini (se configurado)
-    ai_summary = None
-    if GEMINI_API_KEY:
-        print("Gerando sumário com Gemini...")
-        ai_summary = generate_ai_summary(new_sprint, new_backlog, changed, new_epics)
+    # Gera sumário via Gemini (se configurado) em paralelo com a montagem
+    # dos cards e a gravação do estado, que não dependem dele
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        ai_future = None
+        if GEMINI_API_KEY:
+            print("Gerando sumário com Gemini...")
+            ai_future = pool.submit(generate_ai_summary, new_sprint, new_backlog, changed, new_epics)
 
-    payload = build_slack_payload(new_sprint, new_backlog, changed, new_epics, ai_summary)
+        issue_blocks = build_issue_blocks(new_sprint, new_backlog, changed, new_epics)
+
+        # Persiste antes do envio: o estado não depende do resultado do webhook
+        _save_and_report(current_state)
+
+        ai_summary = ai_future.result() if ai_future else None
+
+    payload = build_slack_payload(new_sprint, new_backlog, changed, new_epics, ai_summary, issue_blocks)
     send_alert(payload)
 
     print(
@@ -665,9 +960,6 @@ def main():
         f"{len(new_backlog)} novo(s) no backlog, {len(changed)} atualização(ões)."
     )
 
-    save_current_state(current_state)
-    print("Estado atualizado no last_state.json")
-
 
 if __name__ == "__main__":
     main()